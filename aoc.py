@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import argparse
+from contextlib import contextmanager
+import importlib
+import mmap
+import sys
+from typing import Iterator, List, Union
+
+def load_input(path: str) -> Union[bytes, mmap.mmap]:
+    """Memory map the input file, or read the whole stdin when the path is '-'."""
+    if path == '-':
+        return sys.stdin.buffer.read()
+    with open(path, 'rb') as file:
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files can not be mapped
+            return b''
+
+@contextmanager
+def open_input(path: str) -> Iterator[Union[bytes, mmap.mmap]]:
+    """load_input for a with statement, the memory map is closed on exit."""
+    buffer = load_input(path)
+    try:
+        yield buffer
+    finally:
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+
+BLOCK_SIZE = 1 << 20
+
+def read_blocks(buffer: Union[bytes, mmap.mmap]) -> Iterator[bytes]:
+    """Blocks of whole lines without their last line break, so only a block is copied out of the buffer at a time."""
+    start = 0
+    length = len(buffer)
+    while start < length:
+        stop = start + BLOCK_SIZE
+        if stop >= length:
+            # a line break at the very end does not start a new line
+            end = length - 1 if buffer[length - 1:length] == b'\n' else length
+        else:
+            end = buffer.rfind(b'\n', start, stop)
+            if end == -1:
+                # lines longer than a block
+                end = buffer.find(b'\n', stop)
+            if end == -1:
+                end = length
+        yield buffer[start:end]
+        start = end + 1
+
+def read_lines(buffer: Union[bytes, mmap.mmap]) -> Iterator[bytes]:
+    for block in read_blocks(buffer):
+        yield from block.split(b'\n')
+
+def run(day: int, path: str, parts: List[int], verify: bool) -> None:
+    # only the requested day is imported
+    module = importlib.import_module(f'day{day}')
+    if verify:
+        module.verify()
+    with open_input(path) as buffer:
+        if len(parts) > 1 and hasattr(module, 'solve_all'):
+            # days sharing work between the parts solve them in one pass
+            answers = module.solve_all(buffer)
+        else:
+            answers = [module.solve(buffer, part) for part in parts]
+    for (part, answer) in zip(parts, answers):
+        print(f'Day {day} part {part}: {answer}')
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog='aoc', description='Advent of Code 2022 solutions runner')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='solve a day puzzle')
+    run_parser.add_argument('day', type=int, choices=range(1, 11))
+    run_parser.add_argument('input', nargs='?', default='-', help="puzzle input, '-' for stdin")
+    run_parser.add_argument('--part', type=int, choices=(1, 2), help='solve only this part')
+    run_parser.add_argument('--verify', action='store_true', help='check the puzzle examples first')
+
+    args = parser.parse_args(argv)
+    run(args.day, args.input, [args.part] if args.part else [1, 2], args.verify)
+
+if __name__ == '__main__':
+    main()
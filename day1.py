@@ -1,5 +1,12 @@
 #!/usr/bin/env python3
 import fileinput
+import heapq
+import re
+import sys
+import time
+from typing import Iterable, Iterator, List
+
+from aoc import open_input, read_blocks
 
 def read(iterable):
     elves_calories = []
@@ -11,12 +18,123 @@ def read(iterable):
             elf_calories = 0
             continue
         elf_calories += int(line)
+    if elf_calories:
+        elves_calories.append(elf_calories)
     return elves_calories
 
+# empty or whitespace only lines separate the elves
+blank_line = re.compile(rb'^[^\S\n]*$', re.MULTILINE)
+
+def read_buffer(buffer: bytes) -> Iterator[int]:
+    elf_calories = 0
+    for block in read_blocks(buffer):
+        elves = blank_line.split(block)
+        # the first elf of a block started in the previous one
+        elf_calories += sum(map(int, elves[0].split()))
+        for elf in elves[1:]:
+            yield elf_calories
+            elf_calories = sum(map(int, elf.split()))
+
+    # the last elf may not be followed by a blank line
+    if elf_calories:
+        yield elf_calories
+
+def read_file(path: str) -> Iterator[int]:
+    with open_input(path) as buffer:
+        yield from read_buffer(buffer)
+
+def top(elves_calories: Iterable[int], k: int = 3) -> List[int]:
+    return heapq.nlargest(k, elves_calories)
+
+class Follower(object):
+    def __init__(self, path: str, k: int = 3) -> None:
+        self.path = path
+        self.k = k
+        self.offset = 0
+        self.elf_calories = 0
+        self._line = b''
+        self._top = []
+
+    def feed(self, data: bytes) -> None:
+        lines = (self._line + data).split(b'\n')
+        # the last line is not complete until a newline is appended
+        self._line = lines.pop()
+        for line in lines:
+            if not line.strip():
+                if len(self._top) < self.k:
+                    heapq.heappush(self._top, self.elf_calories)
+                else:
+                    heapq.heappushpop(self._top, self.elf_calories)
+                self.elf_calories = 0
+                continue
+            self.elf_calories += int(line)
+
+    def refresh(self) -> List[int]:
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            data = file.read()
+        self.offset += len(data)
+        self.feed(data)
+        return self.top()
+
+    def top(self) -> List[int]:
+        # the unterminated line may still be being written, only complete lines are counted
+        current_elf = [self.elf_calories] if self.elf_calories else []
+        return top(self._top + current_elf, self.k)
+
+
+def solve(buffer: bytes, part: int) -> int:
+    return sum(top(read_buffer(buffer), 1 if part == 1 else 3))
+
+def solve_all(buffer: bytes) -> List[int]:
+    top_three = top(read_buffer(buffer), 3)
+    return [sum(top_three[:1]), sum(top_three)]
+
+def verify() -> None:
+    test_buffer = b'1000\n2000\n3000\n\n4000\n\n5000\n6000\n\n7000\n8000\n9000\n\n10000'
+    assert list(read_buffer(test_buffer)) == [6000, 4000, 11000, 24000, 10000]
+    assert top(read_buffer(test_buffer), 3) == [24000, 11000, 10000]
+    assert list(read_buffer(test_buffer + b'\n')) == [6000, 4000, 11000, 24000, 10000]
+    assert list(read_buffer(b'1000\r\n2000\r\n\r\n3000\r\n')) == [3000, 3000]
+    assert list(read_buffer(b'1000\n \n2000\n')) == [1000, 2000]
+    assert solve(test_buffer, 1) == 24000
+    assert solve(test_buffer, 2) == 45000
+    assert solve_all(test_buffer) == [24000, 45000]
+
+    test_follower = Follower(None)
+    for i in range(0, len(test_buffer), 7):
+        test_follower.feed(test_buffer[i:i + 7])
+    assert test_follower.top() == [24000, 11000, 6000]
+    test_follower.feed(b'\n')
+    assert test_follower.top() == [24000, 11000, 10000]
+
+    test_follower = Follower(None)
+    test_follower.feed(b'1000\n2000\n\n12')
+    assert test_follower.top() == [3000]
+    test_follower.feed(b'34\n')
+    assert test_follower.top() == [3000, 1234]
+
 
 if __name__ == '__main__':
-    top_three = sorted((elf_calories for elf_calories in read(fileinput.input())), reverse=True)[:3]
-    
+    # the puzzle examples are only checked on request
+    if '--verify' in sys.argv:
+        sys.argv.remove('--verify')
+        verify()
+
+    if len(sys.argv) == 3 and sys.argv[1] == '--follow':
+        follower = Follower(sys.argv[2])
+        while True:
+            top_three = follower.refresh()
+            # the followed file may not hold a complete elf yet
+            if top_three:
+                print(f"Max calories: {top_three[0]}, Top 3 calories: {sum(top_three)}")
+            time.sleep(1)
+
+    if len(sys.argv) == 2:
+        top_three = top(read_file(sys.argv[1]), 3)
+    else:
+        top_three = top(read(fileinput.input()), 3)
+
     max_calories = top_three[0]
     print(f"Max calories: {max_calories}")
 
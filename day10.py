@@ -1,71 +1,129 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
 import fileinput
-from typing import Any, Iterable, List
+import heapq
+import os
+import sys
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from aoc import read_lines
 
 class Instruction(ABC):
+    cycles = 1
+
     @abstractmethod
     def execute(self, cpu: CPU) -> None:
+        """Apply the instruction once its last cycle has finished."""
         pass
 
 
 class Noop(Instruction):
-    def execute(self, cpu: CPU):
-        return True
+    def execute(self, cpu: CPU) -> None:
+        pass
 
     def __repr__(self) -> str:
         return 'Noop'
 
 
 class Addx(Instruction):
+    cycles = 2
+
     def __init__(self, immediate: int) -> None:
-        self._cycle = 0
         self._immediate = immediate
 
-    def execute(self, cpu: CPU):
-        self._cycle += 1
-        if self._cycle == 2:
-            cpu.x += self._immediate
-            return True
-        return False
+    def execute(self, cpu: CPU) -> None:
+        cpu.x += self._immediate
 
     def __repr__(self) -> str:
         return f'Addx({self._immediate})'
 
 
+class Periodic(object):
+    def __init__(self, start: int, period: int, count: int = None) -> None:
+        self._start = start
+        self._period = period
+        self._count = count
+
+    def next(self, cycle: int) -> Optional[int]:
+        """First scheduled cycle from the given one on."""
+        i = max(0, -(-(cycle - self._start) // self._period))
+        if self._count is not None and i >= self._count:
+            return None
+        return self._start + i * self._period
+
+
+class Cycles(object):
+    def __init__(self, cycles: Iterable[int]) -> None:
+        self._cycles = sorted(set(cycles))
+
+    def next(self, cycle: int) -> Optional[int]:
+        """First scheduled cycle from the given one on."""
+        i = bisect_left(self._cycles, cycle)
+        return self._cycles[i] if i < len(self._cycles) else None
+
+
+EVERY_CYCLE = Periodic(1, 1)
+
+
 class CPU(object):
     def __init__(self, program: Iterable[Instruction]) -> None:
         self.x = 1
         self.cycle = 0
+        # probes are called during the cycles of their `schedule`, or every cycle when they have none
         self.probes = []
         self._instruction = next(program)
+        self._remaining = self._instruction.cycles
         self._program = program
 
+    def _retire(self) -> None:
+        self._instruction.execute(self)
+        self._instruction = next(self._program, None)
+        if self._instruction:
+            self._remaining = self._instruction.cycles
+
     def tick(self) -> None:
         self.cycle += 1
 
         for probe in self.probes:
-            probe(self)
+            if getattr(probe, 'schedule', EVERY_CYCLE).next(self.cycle) == self.cycle:
+                probe(self)
 
-        finished = self._instruction.execute(self)
-        if finished:
-            self._instruction = next(self._program, None)
+        self._remaining -= 1
+        if not self._remaining:
+            self._retire()
 
     def run(self) -> None:
+        schedules = [getattr(probe, 'schedule', EVERY_CYCLE) for probe in self.probes]
+        # probes fire in cycle order, and in the order of self.probes within a cycle as with tick
+        next_cycles = [(schedule.next(self.cycle + 1), i) for (i, schedule) in enumerate(schedules)]
+        next_cycles = [(cycle, i) for (cycle, i) in next_cycles if cycle is not None]
+        heapq.heapify(next_cycles)
         while self._instruction:
-            self.tick()
+            # x does not change until the current instruction finishes
+            last_cycle = self.cycle + self._remaining
+            while next_cycles and next_cycles[0][0] <= last_cycle:
+                (self.cycle, i) = next_cycles[0]
+                self.probes[i](self)
+                cycle = schedules[i].next(self.cycle + 1)
+                if cycle is None:
+                    heapq.heappop(next_cycles)
+                else:
+                    heapq.heapreplace(next_cycles, (cycle, i))
+            self.cycle = last_cycle
+            self._retire()
 
 
 class SignalStrengthProbe(object):
-    __cycles_set = {20 + 40 * i for i in range(6)}
+    schedule = Periodic(20, 40, 6)
 
     def __init__(self) -> None:
         self.signal_strength = 0
 
     def __call__(self, cpu: CPU) -> None:
-        if cpu.cycle in self.__cycles_set:
-            self.signal_strength += cpu.cycle * cpu.x
+        self.signal_strength += cpu.cycle * cpu.x
 
 
 class DrawProbe(object):
@@ -84,7 +142,7 @@ class DrawProbe(object):
     def print(self) -> None:
         for y in range(self.__height):
             pos = y * self.__width
-            print(''.join(self._screen[pos:pos + 39]))
+            print(''.join(self._screen[pos:pos + self.__width]))
 
 
 def compile(asm: List[str]) -> Iterable[Instruction]:
@@ -95,7 +153,222 @@ def compile(asm: List[str]) -> Iterable[Instruction]:
             yield Addx(int(line[5:]))
 
 
+class Framebuffer(object):
+    def __init__(self, width: int = 40, height: int = 6, sink: Callable[[bytes], Any] = None) -> None:
+        self.width = width
+        self.height = height
+        self.frames = 0
+        # every completed frame is sent to the sink as its rows followed by line breaks
+        self._sink = sink if sink else sys.stdout.buffer.write
+        self._screen = bytearray(b'.' * (width * height))
+        self._pixel = 0
+
+    def paint(self, x: int, cycles: int) -> None:
+        """Draw the pixels of the next cycles while the sprite is centered at x."""
+        while cycles:
+            column = self._pixel % self.width
+            row_start = self._pixel - column
+            pixels = min(cycles, self.width - column)
+            # the sprite covers the columns x - 1 to x + 1
+            start = max(column, x - 1)
+            end = min(column + pixels - 1, x + 1)
+            if start <= end:
+                self._screen[row_start + start:row_start + end + 1] = b'#' * (end - start + 1)
+            self._pixel += pixels
+            cycles -= pixels
+            if self._pixel == len(self._screen):
+                self.flush()
+
+    def flush(self) -> None:
+        """Send the current frame to the sink, even if it is not complete, and start a new one."""
+        if not self._pixel:
+            return
+        self._sink(b''.join(self._screen[y * self.width:(y + 1) * self.width] + b'\n' for y in range(self.height)))
+        self.frames += 1
+        self._screen[:] = b'.' * len(self._screen)
+        self._pixel = 0
+
+
+NOOP = 0
+ADDX = 1
+
+OPCODE_CYCLES = {NOOP: 1, ADDX: 2}
+
+def compile_bytecode(asm: Iterable[str]) -> Tuple[array, array]:
+    opcodes = array('b')
+    operands = array('q')
+    for line in asm:
+        if line == 'noop':
+            opcodes.append(NOOP)
+            operands.append(0)
+        elif line[:4] == 'addx':
+            opcodes.append(ADDX)
+            operands.append(int(line[5:]))
+    return (opcodes, operands)
+
+
+class Timeline(object):
+    def __init__(self, opcodes: array, operands: array) -> None:
+        # x is values[i] from cycle starts[i] until the cycle before starts[i + 1]
+        self._starts = array('q', [1])
+        self._values = array('q', [1])
+        self.cycles = 0
+        x = 1
+        for (opcode, operand) in zip(opcodes, operands):
+            self.cycles += OPCODE_CYCLES[opcode]
+            if opcode == ADDX and operand:
+                x += operand
+                self._starts.append(self.cycles + 1)
+                self._values.append(x)
+
+    def x(self, cycle: int) -> int:
+        """Value of x during the cycle."""
+        return self._values[bisect_right(self._starts, cycle) - 1]
+
+    def signal_strength(self, cycles: Iterable[int]) -> int:
+        return sum(cycle * self.x(cycle) for cycle in cycles)
+
+    def render(self, width: int = 40, height: int = 6) -> List[str]:
+        pixels = []
+        for pixel in range(width * height):
+            x = self.x(pixel + 1)
+            pixels.append('#' if x - 1 <= pixel % width <= x + 1 else '.')
+        return [''.join(pixels[y * width:(y + 1) * width]) for y in range(height)]
+
+    def draw(self, framebuffer: Framebuffer) -> None:
+        for (i, start) in enumerate(self._starts):
+            end = self._starts[i + 1] if i + 1 < len(self._starts) else self.cycles + 1
+            framebuffer.paint(self._values[i], end - start)
+
+
+SIGNAL_CYCLES = tuple(20 + 40 * i for i in range(6))
+
+def run_batch(programs: Iterable[Iterable[str]], cycles: Iterable[int] = SIGNAL_CYCLES, width: int = 40, height: int = 6) -> Tuple['np.ndarray', 'np.ndarray']:
+    """Signal strengths (N,) and lit CRT pixels (N, height, width) of many programs at once."""
+    import numpy as np
+
+    compiled = [compile_bytecode(program) for program in programs]
+    length = max((len(opcodes) for (opcodes, _) in compiled), default=0)
+
+    # padding instructions take no cycles and do not change x
+    durations = np.zeros((len(compiled), length), dtype=np.int64)
+    operands = np.zeros((len(compiled), length), dtype=np.int64)
+    cycles_table = np.array([OPCODE_CYCLES[opcode] for opcode in sorted(OPCODE_CYCLES)])
+    for (i, (program_opcodes, program_operands)) in enumerate(compiled):
+        durations[i, :len(program_opcodes)] = cycles_table[np.frombuffer(program_opcodes, dtype=np.int8)]
+        operands[i, :len(program_operands)] = np.frombuffer(program_operands, dtype=np.int64)
+
+    # last cycle of every instruction and x once it finishes, x is 1 before the first one
+    ends = np.cumsum(durations, axis=1)
+    xs = np.hstack((np.ones((len(compiled), 1), dtype=np.int64), 1 + np.cumsum(operands, axis=1)))
+    total_cycles = ends[:, -1] if length else np.zeros(len(compiled), dtype=np.int64)
+
+    def x(cycles: np.ndarray) -> np.ndarray:
+        # x during a cycle comes from the instructions finished before it, found with a single
+        # searchsorted over all programs by shifting every program ends to its own range
+        span = int(ends.max(initial=0)) + int(cycles.max(initial=0)) + 2
+        offsets = np.arange(len(compiled))[:, None] * span
+        finished = np.searchsorted((ends + offsets).ravel(), ((cycles - 1)[None, :] + offsets).ravel(), side='right')
+        finished = finished.reshape(len(compiled), len(cycles)) - np.arange(len(compiled))[:, None] * length
+        return np.take_along_axis(xs, finished, axis=1)
+
+    signal_cycles = np.array(list(cycles), dtype=np.int64)
+    running = signal_cycles[None, :] <= total_cycles[:, None]
+    signal_strengths = (signal_cycles * x(signal_cycles) * running).sum(axis=1)
+
+    pixel_cycles = np.arange(1, width * height + 1)
+    columns = (pixel_cycles - 1) % width
+    running = pixel_cycles[None, :] <= total_cycles[:, None]
+    frames = (np.abs(columns[None, :] - x(pixel_cycles)) <= 1) & running
+
+    return (signal_strengths, frames.reshape(len(compiled), height, width))
+
+
+def _answer(timeline: Timeline, part: int) -> Any:
+    if part == 1:
+        return timeline.signal_strength(SIGNAL_CYCLES)
+    return '\n'.join(timeline.render())
+
+def _timeline(buffer: bytes) -> Timeline:
+    return Timeline(*compile_bytecode(line.decode().strip() for line in read_lines(buffer)))
+
+def solve(buffer: bytes, part: int) -> Any:
+    return _answer(_timeline(buffer), part)
+
+def solve_all(buffer: bytes) -> List[Any]:
+    timeline = _timeline(buffer)
+    return [_answer(timeline, part) for part in (1, 2)]
+
+def verify() -> None:
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'day10-test.txt')) as test_file:
+        test_asm = [line.strip() for line in test_file]
+    test_signal_strength_probe = SignalStrengthProbe()
+    test_cpu = CPU(compile(test_asm))
+    test_cpu.probes.append(test_signal_strength_probe)
+    test_cpu.run()
+    assert test_signal_strength_probe.signal_strength == 13140
+
+    for run in (lambda cpu: cpu.run(), lambda cpu: [cpu.tick() for _ in range(5)]):
+        test_x_values = []
+        test_probe = lambda cpu: test_x_values.append((cpu.cycle, cpu.x))
+        test_probe.schedule = Cycles({1, 3, 4, 5})
+        test_cpu = CPU(compile(['noop', 'addx 3', 'addx -5']))
+        test_cpu.probes.append(test_probe)
+        run(test_cpu)
+        assert test_x_values == [(1, 1), (3, 1), (4, 4), (5, 4)]
+        assert test_cpu.x == -1
+
+        test_calls = []
+        test_probe1 = lambda cpu: test_calls.append((cpu.cycle, 1))
+        test_probe1.schedule = Cycles({2, 3})
+        test_probe2 = lambda cpu: test_calls.append((cpu.cycle, 2))
+        test_probe2.schedule = Cycles({1, 3})
+        test_cpu = CPU(compile(['noop', 'addx 3', 'addx -5']))
+        test_cpu.probes.extend((test_probe1, test_probe2))
+        run(test_cpu)
+        assert test_calls == [(1, 2), (2, 1), (3, 1), (3, 2)]
+
+    test_timeline = Timeline(*compile_bytecode(test_asm))
+    assert test_timeline.signal_strength(20 + 40 * i for i in range(6)) == 13140
+    assert [test_timeline.x(cycle) for cycle in (20, 60, 100, 140, 180, 220)] == [21, 19, 18, 21, 16, 18]
+    assert test_timeline.render() == [
+        '##..##..##..##..##..##..##..##..##..##..',
+        '###...###...###...###...###...###...###.',
+        '####....####....####....####....####....',
+        '#####.....#####.....#####.....#####.....',
+        '######......######......######......####',
+        '#######.......#######.......#######.....',
+    ]
+
+    test_frames = []
+    test_framebuffer = Framebuffer(sink=test_frames.append)
+    test_timeline.draw(test_framebuffer)
+    assert test_frames == [''.join(row + '\n' for row in test_timeline.render()).encode()]
+
+    test_frames = []
+    test_framebuffer = Framebuffer(10, 3, test_frames.append)
+    test_timeline.draw(test_framebuffer)
+    test_framebuffer.flush()
+    assert test_framebuffer.frames == 8
+    assert test_frames[0] == b'##..##..##\n....##....\n..........\n'
+
+    (test_signal_strengths, test_screens) = run_batch([test_asm, ['noop', 'addx 3', 'addx -5'], []])
+    assert test_signal_strengths.tolist() == [13140, 0, 0]
+    assert [''.join('#' if pixel else '.' for pixel in row) for row in test_screens[0]] == test_timeline.render()
+    assert ''.join('#' if pixel else '.' for pixel in test_screens[1][0]) == '#####' + '.' * 35
+    assert not test_screens[2].any()
+
+    test_buffer = '\n'.join(test_asm).encode()
+    assert solve(test_buffer, 1) == 13140
+    assert solve(test_buffer, 2) == '\n'.join(test_timeline.render())
+    assert solve_all(test_buffer) == [13140, '\n'.join(test_timeline.render())]
+
 if __name__ == '__main__':
+    # the puzzle examples are only checked on request
+    if '--verify' in sys.argv:
+        sys.argv.remove('--verify')
+        verify()
+
     program = compile(line.strip() for line in fileinput.input())
 
     signal_strength_probe = SignalStrengthProbe()
@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 from enum import IntEnum
-import fileinput
+import sys
+from typing import List, Tuple
+
+import numpy as np
+
+from aoc import open_input
 
 class Shape(IntEnum):
     ROCK = 1
@@ -60,19 +65,58 @@ def part2(line: str) -> int:
     result = result_codes[line[2]]
     return my_shape(oponent, result) + result
 
-if __name__ == '__main__':
+# scores indexed by [oponent code - 'A'][my code - 'X']
+part1_scores = [[part1(f'{oponent} {me}') for me in my_codes] for oponent in oponent_codes]
+part2_scores = [[part2(f'{oponent} {me}') for me in my_codes] for oponent in oponent_codes]
+
+def score(buffer: bytes) -> Tuple[int, int]:
+    # ignore trailing whitespace so every line has the same width
+    length = len(buffer)
+    while length and buffer[length - 1] in b' \r\n':
+        length -= 1
+    if not length:
+        return (0, 0)
+    width = buffer.find(b'\n') + 1 or length + 1
+
+    # view the first 3 columns of every line without copying, the last line may have no line break
+    data = np.frombuffer(buffer, dtype=np.uint8, count=length)
+    lines = np.lib.stride_tricks.as_strided(data, shape=(-(-length // width), 3), strides=(width, 1))
+
+    # count how many times each of the 9 rounds is played and weight them with the score tables
+    rounds = (lines[:, 0] - ord('A')) * 3 + (lines[:, 2] - ord('X'))
+    counts = np.bincount(rounds, minlength=9)
+    return (
+        int(counts @ np.array(part1_scores).ravel()),
+        int(counts @ np.array(part2_scores).ravel()),
+    )
+
+def solve(buffer: bytes, part: int) -> int:
+    return score(buffer)[part - 1]
+
+def solve_all(buffer: bytes) -> List[int]:
+    return list(score(buffer))
+
+def verify() -> None:
     assert part1('A Y') == 8
     assert part1('B X') == 1
     assert part1('C Z') == 6
 
-    lines = list(fileinput.input())
-
-    part1_total_score =sum(part1(line) for line in lines)
-    print(f"Part1 total score: {part1_total_score}")
-
     assert part2('A Y') == 4
     assert part2('B X') == 1
     assert part2('C Z') == 7
 
-    part2_total_score =sum(part2(line) for line in lines)
+    assert score(b'A Y\nB X\nC Z\n') == (15, 12)
+    assert score(b'A Y\r\nB X\r\nC Z') == (15, 12)
+    assert score(b'A Y\nB X\nC Z') == (15, 12)
+    assert score(b'A Y\n\n') == (8, 4)
+
+if __name__ == '__main__':
+    # the puzzle examples are only checked on request
+    if '--verify' in sys.argv:
+        sys.argv.remove('--verify')
+        verify()
+
+    with open_input(sys.argv[1] if len(sys.argv) > 1 else '-') as buffer:
+        (part1_total_score, part2_total_score) = score(buffer)
+    print(f"Part1 total score: {part1_total_score}")
     print(f"Part1 total score: {part2_total_score}")
@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
-import fileinput
-from typing import Iterable, Set, Tuple, TypeVar
+from functools import reduce
+from operator import or_
+import string
+import sys
+from typing import Iterable, List, Tuple, TypeVar
+
+import numpy as np
+
+from aoc import open_input, read_blocks
 
 T = TypeVar("T")
 
@@ -8,26 +15,80 @@ def grouped(iterable: Iterable[T], n=2) -> Iterable[Tuple[T, ...]]:
     """s -> (s0,s1,s2,...sn-1), (sn,sn+1,sn+2,...s2n-1), ..."""
     return zip(*[iter(iterable)] * n)
 
-def parse_items(items: str) -> Set[str]:
-    return set(items)
-
-def parse_rucksack(items: str) -> Tuple[Set[str], Set[str]]:
-    boundary = len(items) // 2
-    return (parse_items(items[:boundary]), parse_items(items[boundary:]))
-
 def priority(item: str) -> int:
     if 'a' <= item <= 'z':
         return ord(item) - ord('a') + 1
     return ord(item) - ord('A') + 27
 
-def part1(items: str) -> str:
-    (compartment1, compartment2) = parse_rucksack(items)
-    return priority((compartment1 & compartment2).pop())
+# each item is a bit in a 52 bits mask, bit n - 1 for the item with priority n
+item_bits = {item: 1 << (priority(item) - 1) for item in string.ascii_letters}
+
+def parse_items_mask(items: str) -> int:
+    return reduce(or_, map(item_bits.__getitem__, items), 0)
+
+def parse_rucksack_mask(items: str) -> Tuple[int, int]:
+    boundary = len(items) // 2
+    return (parse_items_mask(items[:boundary]), parse_items_mask(items[boundary:]))
+
+def mask_priority(mask: int) -> int:
+    return mask.bit_length()
+
+def part1(items: str) -> int:
+    (compartment1, compartment2) = parse_rucksack_mask(items)
+    return mask_priority(compartment1 & compartment2)
 
 def part2(elf1: str, elf2: str, elf3: str) -> int:
-    return priority((parse_items(elf1) & parse_items(elf2) & parse_items(elf3)).pop())
+    return mask_priority(parse_items_mask(elf1) & parse_items_mask(elf2) & parse_items_mask(elf3))
 
-if __name__ == '__main__':
+def priorities(buffer: bytes) -> Tuple[int, int]:
+    table = np.zeros(256, dtype=np.uint64)
+    for item, bit in item_bits.items():
+        table[ord(item)] = bit
+
+    part1_sum = 0
+    part2_sum = 0
+    # rucksacks of a group not completed by the previous block
+    pending = np.zeros(0, dtype=np.uint64)
+
+    # masks are 8 bytes per item, so they are only built for a block of whole lines at a time
+    for block in read_blocks(buffer):
+        block = np.frombuffer(block, dtype=np.uint8)
+        if not len(block):
+            continue
+        # blocks do not hold the line break of their last line
+        ends = np.append(np.flatnonzero(block == ord('\n')), len(block))
+
+        line_starts = np.concatenate(([0], ends[:-1] + 1))
+        lengths = ends - line_starts - (block[np.maximum(ends - 1, 0)] == ord('\r'))
+        # skip blank lines
+        (line_starts, lengths) = (line_starts[lengths > 0], lengths[lengths > 0])
+        if not len(line_starts):
+            continue
+
+        bits = table[block]
+
+        # part 1: or-reduce each half of every line, segments are [start, middle) and [middle, next start)
+        compartments = np.bitwise_or.reduceat(bits, np.stack((line_starts, line_starts + lengths // 2), axis=1).ravel())
+        compartments = compartments.reshape(-1, 2)
+        common = compartments[:, 0] & compartments[:, 1]
+        part1_sum += int((np.log2(common[common > 0]).astype(np.int64) + 1).sum())
+
+        # part 2: or-reduce every line, and-reduce every group of 3 lines
+        rucksacks = np.concatenate((pending, np.bitwise_or.reduceat(bits, line_starts)))
+        complete = len(rucksacks) - len(rucksacks) % 3
+        pending = rucksacks[complete:]
+        common = np.bitwise_and.reduce(rucksacks[:complete].reshape(-1, 3), axis=1)
+        part2_sum += int((np.log2(common[common > 0]).astype(np.int64) + 1).sum())
+
+    return (part1_sum, part2_sum)
+
+def solve(buffer: bytes, part: int) -> int:
+    return priorities(buffer)[part - 1]
+
+def solve_all(buffer: bytes) -> List[int]:
+    return list(priorities(buffer))
+
+def verify() -> None:
     assert part1('vJrwpWtwJgWrhcsFMMfFFhFp') == 16
     assert part1('jqHRNqRjqzjGDLGLrsFMfFZSrLrFZsSL') == 38
     assert part1('PmmdzqPrVvPwwTWBwg') == 42
@@ -35,12 +96,6 @@ if __name__ == '__main__':
     assert part1('ttgJtRGJQctTZtZT') == 20
     assert part1('CrZsJsPPZsGzwwsLwLmpwMDw') == 19
 
-    lines = [line.strip() for line in fileinput.input()]
-
-    sum_item_priorities = sum(part1(line) for line in lines)
-    print(f"Sum of item priorities: {sum_item_priorities}")
-
-
     assert part2(
         'vJrwpWtwJgWrhcsFMMfFFhFp',
         'jqHRNqRjqzjGDLGLrsFMfFZSrLrFZsSL',
@@ -51,6 +106,21 @@ if __name__ == '__main__':
         'ttgJtRGJQctTZtZT',
         'CrZsJsPPZsGzwwsLwLmpwMDw'
         ) == 52
-    sum_group_priorities = sum(part2(*group) for group in grouped(lines, 3))
-    print(f"Sum of group priorities: {sum_group_priorities}")
 
+    assert priorities(b'''vJrwpWtwJgWrhcsFMMfFFhFp
+jqHRNqRjqzjGDLGLrsFMfFZSrLrFZsSL
+PmmdzqPrVvPwwTWBwg
+wMqvLMZHhHMvwLHjbvcjnnSBnvTQFn
+ttgJtRGJQctTZtZT
+CrZsJsPPZsGzwwsLwLmpwMDw''') == (157, 70)
+
+if __name__ == '__main__':
+    # the puzzle examples are only checked on request
+    if '--verify' in sys.argv:
+        sys.argv.remove('--verify')
+        verify()
+
+    with open_input(sys.argv[1] if len(sys.argv) > 1 else '-') as buffer:
+        (sum_item_priorities, sum_group_priorities) = priorities(buffer)
+    print(f"Sum of item priorities: {sum_item_priorities}")
+    print(f"Sum of group priorities: {sum_group_priorities}")
@@ -1,24 +1,114 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
 import fileinput
-from typing import Set, Tuple
+import sys
+from typing import List, Tuple
 
-def parse_assignment(assignment: str) -> Set[int]:
+import numpy as np
+
+from aoc import read_blocks
+
+Assignment = Tuple[int, int]
+
+def parse_assignment(assignment: str) -> Assignment:
     (start, end) = assignment.split("-", 1)
-    return set(range(int(start), int(end) + 1))
+    return (int(start), int(end))
 
-def parse_pair(pair: str) -> Tuple[Set[int], Set[int]]:
+def parse_pair(pair: str) -> Tuple[Assignment, Assignment]:
     (assignment1, assignment2) = pair.split(",", 1)
     return (parse_assignment(assignment1), parse_assignment(assignment2))
 
-def part1(assignment1: Set[int], assignment2: Set[int]) -> bool:
-    return assignment1.issuperset(assignment2) or assignment2.issuperset(assignment1)
+def part1(assignment1: Assignment, assignment2: Assignment) -> bool:
+    return (assignment1[0] <= assignment2[0] and assignment2[1] <= assignment1[1]) \
+        or (assignment2[0] <= assignment1[0] and assignment1[1] <= assignment2[1])
 
-def part2(assignment1: Set[int], assignment2: Set[int]) -> bool:
-    return not assignment1.isdisjoint(assignment2)
+def part2(assignment1: Assignment, assignment2: Assignment) -> bool:
+    return assignment1[0] <= assignment2[1] and assignment2[0] <= assignment1[1]
 
-if __name__ == '__main__':
-    pairs = [parse_pair(line.strip()) for line in fileinput.input()]
+class IntervalNode(object):
+    def __init__(self, assignments: List[Tuple[Assignment, int]]) -> None:
+        endpoints = sorted(endpoint for (assignment, _) in assignments for endpoint in assignment)
+        self.center = endpoints[len(endpoints) // 2]
+
+        left = [item for item in assignments if item[0][1] < self.center]
+        right = [item for item in assignments if item[0][0] > self.center]
+        centered = [item for item in assignments if item[0][0] <= self.center <= item[0][1]]
+        self.by_start = sorted(centered, key=lambda item: item[0][0])
+        self.by_end = sorted(centered, key=lambda item: item[0][1], reverse=True)
+        self.left = IntervalNode(left) if left else None
+        self.right = IntervalNode(right) if right else None
+
+class OverlapIndex(object):
+    def __init__(self, pairs: List[Tuple[Assignment, Assignment]]) -> None:
+        assignments = [(assignment, i) for (i, pair) in enumerate(pairs) for assignment in pair]
+        self._starts = sorted(assignment[0] for (assignment, _) in assignments)
+        self._ends = sorted(assignment[1] for (assignment, _) in assignments)
+
+        # sections covered by both assignments of a pair must be counted once
+        shared = [(max(assignment1[0], assignment2[0]), min(assignment1[1], assignment2[1]))
+                  for (assignment1, assignment2) in pairs if part2(assignment1, assignment2)]
+        self._shared_starts = sorted(start for (start, _) in shared)
+        self._shared_ends = sorted(end for (_, end) in shared)
+
+        self._root = IntervalNode(assignments) if assignments else None
+
+    def count(self, section: int) -> int:
+        """Number of pairs with at least one assignment covering the section."""
+        assignments = bisect_right(self._starts, section) - bisect_left(self._ends, section)
+        shared = bisect_right(self._shared_starts, section) - bisect_left(self._shared_ends, section)
+        return assignments - shared
+
+    def overlapping(self, start: int, end: int) -> List[Tuple[Assignment, int]]:
+        """Assignments overlapping the sections start-end, with the index of their pair."""
+        result = []
+        nodes = [self._root] if self._root else []
+        while nodes:
+            node = nodes.pop()
+            if end < node.center:
+                for item in node.by_start:
+                    if item[0][0] > end:
+                        break
+                    result.append(item)
+            elif start > node.center:
+                for item in node.by_end:
+                    if item[0][1] < start:
+                        break
+                    result.append(item)
+            else:
+                result.extend(node.by_start)
+            if node.left and start < node.center:
+                nodes.append(node.left)
+            if node.right and end > node.center:
+                nodes.append(node.right)
+        return result
 
+separators = bytes.maketrans(b'-,', b'  ')
+
+def count_overlaps(buffer: bytes) -> Tuple[int, int]:
+    fully_overlapping_pairs = 0
+    overlapping_pairs = 0
+    # only one block of lines is translated and parsed at a time
+    for block in read_blocks(buffer):
+        if not block.strip():
+            continue
+        # every pair is four integers separated by '-', ',' or a line break
+        pairs = np.fromstring(block.translate(separators), dtype=np.int64, sep=' ').reshape(-1, 4)
+        (start1, end1, start2, end2) = pairs.T
+
+        fully_overlapping = ((start1 <= start2) & (end2 <= end1)) | ((start2 <= start1) & (end1 <= end2))
+        overlapping = (start1 <= end2) & (start2 <= end1)
+        fully_overlapping_pairs += int(fully_overlapping.sum())
+        overlapping_pairs += int(overlapping.sum())
+    return (fully_overlapping_pairs, overlapping_pairs)
+
+def solve(buffer: bytes, part: int) -> int:
+    return count_overlaps(buffer)[part - 1]
+
+def solve_all(buffer: bytes) -> List[int]:
+    return list(count_overlaps(buffer))
+
+def verify() -> None:
     assert part1(*parse_pair('2-4,6-8')) == False
     assert part1(*parse_pair('2-3,4-5')) == False
     assert part1(*parse_pair('5-7,7-9')) == False
@@ -26,6 +116,23 @@ if __name__ == '__main__':
     assert part1(*parse_pair('6-6,4-6')) == True
     assert part1(*parse_pair('2-6,4-8')) == False
 
+    assert count_overlaps(b'2-4,6-8\n2-3,4-5\n5-7,7-9\n2-8,3-7\n6-6,4-6\n2-6,4-8\n') == (2, 4)
+
+    test_index = OverlapIndex([parse_pair(pair) for pair in ['2-4,6-8', '2-3,4-5', '5-7,7-9', '2-8,3-7', '6-6,4-6', '2-6,4-8']])
+    assert test_index.count(1) == 0
+    assert test_index.count(3) == 4
+    assert test_index.count(7) == 4
+    assert sorted(test_index.overlapping(7, 7)) == [((2, 8), 3), ((3, 7), 3), ((4, 8), 5), ((5, 7), 2), ((6, 8), 0), ((7, 9), 2)]
+    assert sorted(test_index.overlapping(9, 12)) == [((7, 9), 2)]
+
+if __name__ == '__main__':
+    # the puzzle examples are only checked on request
+    if '--verify' in sys.argv:
+        sys.argv.remove('--verify')
+        verify()
+
+    pairs = [parse_pair(line.strip()) for line in fileinput.input()]
+
     fully_overlapping_pairs = sum(part1(*pair) for pair in pairs)
     print(f"Fully overlapping pairs: {fully_overlapping_pairs}")
 
@@ -1,48 +1,126 @@
 #!/usr/bin/env python3
-from collections import deque
+from __future__ import annotations
+from array import array
+import copy
 import fileinput
-import re
-from typing import List
+from itertools import takewhile
+import sys
+from typing import Iterable, List, Tuple
 
-class Stacks(object):
-    __move_regex = re.compile('move (?P<moves>\d+) from (?P<orig>\d+) to (?P<dest>\d+)')
+from aoc import read_lines
 
-    def __init__(self, input: List[str]) -> None:
-        columns = sorted(''.join(column)[::-1] for column in zip(*input))
-        self._stacks = [deque(column[1:].strip()) for column in columns if '1' <= column[0] <= '9']
+def parse_movement(movement: str) -> Tuple[int, int, int]:
+    # move <moves> from <orig> to <dest>
+    (_, moves, _, orig, _, dest) = movement.split()
+    return (int(moves), int(orig) - 1, int(dest) - 1)
 
-    def move_9000(self, movement: str) -> None:
-        groups = self.__move_regex.match(movement)
-        moves, orig, dest = int(groups['moves']), int(groups['orig']) - 1, int(groups['dest']) - 1
+def compile(movements: Iterable[str]) -> array:
+    program = array('q')
+    for movement in movements:
+        if movement.strip():
+            program.extend(parse_movement(movement))
+    return program
 
+class Stacks(object):
+    def __init__(self, input: List[str]) -> None:
+        rows = [line.rstrip('\n') for line in input]
+        # crates are at column 1 of every 4 columns wide stack, the last row holds the stack numbers
+        self._stacks = [[] for _ in rows[-1].split()]
+        for row in reversed(rows[:-1]):
+            for (i, stack) in enumerate(self._stacks):
+                crate = row[4 * i + 1:4 * i + 2].strip()
+                if crate:
+                    stack.append(crate)
+
+    def _move(self, moves: int, orig: int, dest: int, keep_order: bool) -> None:
+        if not moves:
+            return
         orig_stack = self._stacks[orig]
-        dest_stack = self._stacks[dest]
-        dest_stack.extend(orig_stack.pop() for _ in range(moves))
+        crates = orig_stack[-moves:]
+        del orig_stack[-moves:]
+        self._stacks[dest].extend(crates if keep_order else reversed(crates))
+
+    def move_9000(self, movement: str) -> None:
+        self._move(*parse_movement(movement), False)
 
     def move_9001(self, movement: str) -> None:
-        groups = self.__move_regex.match(movement)
-        moves, orig, dest = int(groups['moves']), int(groups['orig']) - 1, int(groups['dest']) - 1
+        self._move(*parse_movement(movement), True)
 
-        orig_stack = self._stacks[orig]
-        dest_stack = self._stacks[dest]
-        dest_stack.extend(reversed([orig_stack.pop() for _ in range(moves)]))
+    def run(self, program: array, keep_order: bool, start: int = 0, stop: int = None) -> None:
+        stop = len(program) // 3 if stop is None else stop
+        for i in range(3 * start, 3 * stop, 3):
+            self._move(program[i], program[i + 1], program[i + 2], keep_order)
+
+    def run_9000(self, program: array) -> None:
+        self.run(program, False)
+
+    def run_9001(self, program: array) -> None:
+        self.run(program, True)
+
+    def copy(self) -> Stacks:
+        stacks = copy.copy(self)
+        stacks._stacks = [list(stack) for stack in self._stacks]
+        return stacks
 
     def tops(self) -> str:
-        return ''.join(stack[-1] for stack in self._stacks)
-        
+        return ''.join(stack[-1] if stack else ' ' for stack in self._stacks)
 
-if __name__ == '__main__':
-    lines = fileinput.input()
+class History(object):
+    def __init__(self, stacks: Stacks, program: array, keep_order: bool, interval: int = 1000) -> None:
+        self._program = program
+        self._keep_order = keep_order
+        self._interval = interval
 
-    # read the file header and movements
-    header = []
-    for line in lines:
-        if len(line.strip()) == 0:
-            break
-        header.append(line)
+        # checkpoint i is the state after the first i * interval movements
+        self._checkpoints = [stacks.copy()]
+        moves = len(program) // 3
+        for start in range(0, moves - interval + 1, interval):
+            checkpoint = self._checkpoints[-1].copy()
+            checkpoint.run(program, keep_order, start, start + interval)
+            self._checkpoints.append(checkpoint)
+
+    def __len__(self) -> int:
+        return len(self._program) // 3
+
+    def at(self, moves: int) -> Stacks:
+        """State after the first `moves` movements."""
+        if not 0 <= moves <= len(self):
+            raise ValueError(f'moves must be between 0 and {len(self)}, got {moves}')
+        checkpoint = min(moves // self._interval, len(self._checkpoints) - 1)
+        stacks = self._checkpoints[checkpoint].copy()
+        stacks.run(self._program, self._keep_order, checkpoint * self._interval, moves)
+        return stacks
 
-    movements = [line for line in lines]
+    def tops(self) -> List[str]:
+        """Crates at the top before any movement and after every movement."""
+        stacks = self._checkpoints[0].copy()
+        tops = [stacks.tops()]
+        for i in range(len(self)):
+            stacks.run(self._program, self._keep_order, i, i + 1)
+            tops.append(stacks.tops())
+        return tops
 
+def _parse(buffer: bytes) -> Tuple[Stacks, array]:
+    lines = (line.decode() for line in read_lines(buffer))
+    # the drawing ends at the first blank line, the movements follow
+    header = list(takewhile(str.strip, lines))
+    return (Stacks(header), compile(lines))
+
+def solve(buffer: bytes, part: int) -> str:
+    (stacks, program) = _parse(buffer)
+    stacks.run(program, part == 2)
+    return stacks.tops()
+
+def solve_all(buffer: bytes) -> List[str]:
+    (stacks, program) = _parse(buffer)
+    tops = []
+    for keep_order in (False, True):
+        moved_stacks = stacks.copy()
+        moved_stacks.run(program, keep_order)
+        tops.append(moved_stacks.tops())
+    return tops
+
+def verify() -> None:
     # part 1
     stacks = Stacks([
         '    [D]    ',
@@ -56,12 +134,6 @@ if __name__ == '__main__':
     stacks.move_9000('move 1 from 1 to 2')
     assert stacks.tops() == 'CMZ'
 
-    stacks = Stacks(header)
-    for movement in movements:
-        stacks.move_9000(movement)
-    crates_at_the_top_9000 = stacks.tops()
-    print(f"Crates at the top (CrateMover 9000): {crates_at_the_top_9000}")
-
     # part 2
     stacks = Stacks([
         '    [D]    ',
@@ -75,8 +147,59 @@ if __name__ == '__main__':
     stacks.move_9001('move 1 from 1 to 2')
     assert stacks.tops() == 'MCD'
 
+    stacks = Stacks([
+        '[A]                                         [K]',
+        '[B] [C] [D] [E] [F] [G] [H] [I] [J] [X] [Y] [Z]',
+        ' 1   2   3   4   5   6   7   8   9  10  11  12 ',
+    ])
+    stacks.run_9001(compile(['move 1 from 12 to 10', 'move 0 from 1 to 2', 'move 1 from 1 to 11']))
+    assert stacks.tops() == 'BCDEFGHIJKAZ'
+
+    history = History(Stacks([
+        '    [D]    ',
+        '[N] [C]    ',
+        '[Z] [M] [P]',
+        ' 1   2   3 ',
+    ]), compile(['move 1 from 2 to 1', 'move 3 from 1 to 3', 'move 2 from 2 to 1', 'move 1 from 1 to 2']), True, 3)
+    assert history.tops() == ['NDP', 'DCP', ' CD', 'C D', 'MCD']
+    assert [history.at(moves).tops() for moves in range(len(history) + 1)] == history.tops()
+    for moves in (-1, len(history) + 1):
+        try:
+            history.at(moves)
+            assert False
+        except ValueError:
+            pass
+
+    test_buffer = b'    [D]    \n[N] [C]    \n[Z] [M] [P]\n 1   2   3 \n\nmove 1 from 2 to 1\nmove 3 from 1 to 3\nmove 2 from 2 to 1\nmove 1 from 1 to 2\n'
+    assert solve(test_buffer, 1) == 'CMZ'
+    assert solve(test_buffer, 2) == 'MCD'
+    assert solve_all(test_buffer) == ['CMZ', 'MCD']
+
+if __name__ == '__main__':
+    # the puzzle examples are only checked on request
+    if '--verify' in sys.argv:
+        sys.argv.remove('--verify')
+        verify()
+
+    lines = fileinput.input()
+
+    # read the file header and movements
+    header = []
+    for line in lines:
+        if len(line.strip()) == 0:
+            break
+        header.append(line)
+
+    program = compile(lines)
+
+    # part 1
     stacks = Stacks(header)
-    for movement in movements:
-        stacks.move_9001(movement)
+    stacks.run_9000(program)
+    crates_at_the_top_9000 = stacks.tops()
+    print(f"Crates at the top (CrateMover 9000): {crates_at_the_top_9000}")
+
+    # part 2
+    stacks = Stacks(header)
+    stacks.run_9001(program)
     crates_at_the_top_9001 = stacks.tops()
     print(f"Crates at the top (CrateMover 9001): {crates_at_the_top_9001}")
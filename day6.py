@@ -1,18 +1,108 @@
 #!/usr/bin/env python3
-import fileinput
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import mmap
+import multiprocessing
+import os
+import sys
+import tempfile
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Union
 
 START_PACKET_MARKER_LENGTH = 4
 START_MESSAGE_MARKER_LENGTH = 14
 
+CHUNK_SIZE = 1 << 16
+PARALLEL_CHUNK_SIZE = 1 << 26
+
+def find_start_positions(chunks: Iterable[Union[str, bytes]], marker_lengths: Iterable[int]) -> Dict[int, int]:
+    pending = sorted(set(marker_lengths), reverse=True)
+    positions = {}
+    last_seen = {}
+    # the characters from window_start to position are all different
+    window_start = 0
+    position = 0
+    for chunk in chunks:
+        for char in chunk:
+            seen = last_seen.get(char, -1)
+            if seen >= window_start:
+                window_start = seen + 1
+            last_seen[char] = position
+            position += 1
+            while pending and position - window_start >= pending[-1]:
+                positions[pending.pop()] = position
+            if not pending:
+                return positions
+    return positions
+
 def find_start_position(input: str, marker_length: int) -> int:
-    for i in range(len(input) - (marker_length - 1)):
-        marker = input[i:i + marker_length]
-        if len(set(marker)) == marker_length:
-            return i + marker_length
+    return find_start_positions([input], [marker_length]).get(marker_length)
 
-if __name__ == '__main__':
-    datastream_buffer = fileinput.input().readline()
+def read_chunks(stream: BinaryIO, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    return iter(lambda: stream.read(size), b'')
+
+# earliest start position found by any worker, -1 when none has been found yet
+_found = None
+
+def _init_worker(found: multiprocessing.Value) -> None:
+    global _found
+    _found = found
+
+def _find_in_chunk(path: str, start: int, end: int, marker_length: int) -> Optional[int]:
+    def blocks(buffer: mmap.mmap) -> Iterator[bytes]:
+        for block_start in range(start, end, CHUNK_SIZE):
+            # stop scanning when an earlier chunk already has a marker
+            if -1 < _found.value <= start:
+                return
+            yield buffer[block_start:min(block_start + CHUNK_SIZE, end)]
+
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        position = find_start_positions(blocks(buffer), [marker_length]).get(marker_length)
+    if position is None:
+        return None
+
+    position += start
+    with _found.get_lock():
+        if _found.value == -1 or position < _found.value:
+            _found.value = position
+    return position
+
+def find_start_position_parallel(path: str, marker_length: int, workers: int = None, chunk_size: int = PARALLEL_CHUNK_SIZE) -> Optional[int]:
+    with open(path, 'rb') as file:
+        size = file.seek(0, 2)
+    if not size:
+        return None
 
+    found = multiprocessing.Value('q', -1)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(found,)) as executor:
+        # chunks overlap so that markers crossing a chunk boundary are found
+        futures = {
+            executor.submit(_find_in_chunk, path, start, min(start + chunk_size + marker_length - 1, size), marker_length): start
+            for start in range(0, size, chunk_size)
+        }
+        position = None
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            chunk_position = future.result()
+            if chunk_position is not None and (position is None or chunk_position < position):
+                position = chunk_position
+                for (other, start) in futures.items():
+                    if start > futures[future]:
+                        other.cancel()
+    return position
+
+def _buffer_chunks(buffer: bytes) -> Iterator[bytes]:
+    return (buffer[i:i + CHUNK_SIZE] for i in range(0, len(buffer), CHUNK_SIZE))
+
+def solve(buffer: bytes, part: int) -> int:
+    marker_length = START_PACKET_MARKER_LENGTH if part == 1 else START_MESSAGE_MARKER_LENGTH
+    return find_start_positions(_buffer_chunks(buffer), [marker_length]).get(marker_length)
+
+def solve_all(buffer: bytes) -> List[int]:
+    marker_lengths = [START_PACKET_MARKER_LENGTH, START_MESSAGE_MARKER_LENGTH]
+    start_positions = find_start_positions(_buffer_chunks(buffer), marker_lengths)
+    return [start_positions.get(marker_length) for marker_length in marker_lengths]
+
+def verify() -> None:
     # part 1
     assert find_start_position('mjqjpqmgbljsphdztnvjfqwrcgsmlb', START_PACKET_MARKER_LENGTH) == 7
     assert find_start_position('bvwbjplbgvbhsrlpgdmjqwftvncz', START_PACKET_MARKER_LENGTH) == 5
@@ -20,9 +110,6 @@ if __name__ == '__main__':
     assert find_start_position('nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg', START_PACKET_MARKER_LENGTH) == 10
     assert find_start_position('zcfzfwzzqfrljwzlrfnpqdbhtmscgvjw', START_PACKET_MARKER_LENGTH) == 11
 
-    packet_start_position = find_start_position(datastream_buffer, START_PACKET_MARKER_LENGTH)
-    print(f"Packet start position: {packet_start_position}")
-
     # part 2
     assert find_start_position('mjqjpqmgbljsphdztnvjfqwrcgsmlb', START_MESSAGE_MARKER_LENGTH) == 19
     assert find_start_position('bvwbjplbgvbhsrlpgdmjqwftvncz', START_MESSAGE_MARKER_LENGTH) == 23
@@ -30,5 +117,33 @@ if __name__ == '__main__':
     assert find_start_position('nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg', START_MESSAGE_MARKER_LENGTH) == 29
     assert find_start_position('zcfzfwzzqfrljwzlrfnpqdbhtmscgvjw', START_MESSAGE_MARKER_LENGTH) == 26
 
-    message_start_position = find_start_position(datastream_buffer, START_MESSAGE_MARKER_LENGTH)
-    print(f"Message start position: {message_start_position}")
+    assert find_start_positions([b'mjqjp', b'qmgbljsphdztnvjfqwrcgsmlb'], [START_PACKET_MARKER_LENGTH, START_MESSAGE_MARKER_LENGTH]) == {4: 7, 14: 19}
+    assert solve(b'mjqjpqmgbljsphdztnvjfqwrcgsmlb\n', 2) == 19
+    assert solve_all(b'mjqjpqmgbljsphdztnvjfqwrcgsmlb\n') == [7, 19]
+
+    with tempfile.TemporaryDirectory() as test_directory:
+        test_path = os.path.join(test_directory, 'day6.txt')
+        with open(test_path, 'wb') as test_file:
+            test_file.write(b'nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg\n')
+        # small chunks so the markers cross chunk boundaries
+        for chunk_size in (1, 5, 64):
+            assert find_start_position_parallel(test_path, START_PACKET_MARKER_LENGTH, 2, chunk_size) == 10
+            assert find_start_position_parallel(test_path, START_MESSAGE_MARKER_LENGTH, 2, chunk_size) == 29
+        assert find_start_position_parallel(test_path, 30, 2, 5) is None
+
+if __name__ == '__main__':
+    # the puzzle examples are only checked on request
+    if '--verify' in sys.argv:
+        sys.argv.remove('--verify')
+        verify()
+
+    if len(sys.argv) == 3 and sys.argv[1] == '--parallel':
+        start_positions = {
+            marker_length: find_start_position_parallel(sys.argv[2], marker_length)
+            for marker_length in (START_PACKET_MARKER_LENGTH, START_MESSAGE_MARKER_LENGTH)
+        }
+    else:
+        with open(sys.argv[1], 'rb') if len(sys.argv) > 1 else sys.stdin.buffer as stream:
+            start_positions = find_start_positions(read_chunks(stream), [START_PACKET_MARKER_LENGTH, START_MESSAGE_MARKER_LENGTH])
+    print(f"Packet start position: {start_positions[START_PACKET_MARKER_LENGTH]}")
+    print(f"Message start position: {start_positions[START_MESSAGE_MARKER_LENGTH]}")
@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 from __future__ import annotations
+from array import array
+from bisect import bisect_left, bisect_right
 import fileinput
+from itertools import accumulate
 import re
-from typing import Callable, List
+import sys
+from typing import Callable, Iterator, List, Tuple, Union
 
 TOTAL_DISK_SPACE = 70000000
 UPDATE_SIZE = 30000000
@@ -19,35 +23,153 @@ class Directory(object):
         self.parent = parent
         self._directories = {}
         self._files = []
+        self._size = 0
 
     def cd(self, directory_name: str) -> Directory:
         return self._directories[directory_name]
 
     def mkdir(self, directory_name: str) -> Directory:
+        # listing a directory again must not drop the sizes already counted
+        if directory_name in self._directories:
+            return self._directories[directory_name]
         child = Directory(directory_name, self)
         self._directories[directory_name] = child
         return child
 
     def create_file(self, file_name: str, file_size: int) -> Directory:
         self._files.append(File(file_name, file_size, self))
+        # keep the aggregated size of every ancestor up to date
+        directory = self
+        while directory is not None:
+            directory._size += file_size
+            directory = directory.parent
         return self
 
     def find_directories(self, predicate: Callable[[Directory], bool]) -> List[Directory]:
         directories = []
-        if predicate(self):
-            directories.append(self)
-        for directory in self._directories.values():
-            directories.extend(directory.find_directories(predicate))
+        pending = [self]
+        while pending:
+            directory = pending.pop()
+            if predicate(directory):
+                directories.append(directory)
+            pending.extend(reversed(directory._directories.values()))
         return directories
 
     @property
     def size(self) -> int:
-        return sum(directory.size for directory in self._directories.values()) \
-            + sum(file.size for file in self._files)
+        return self._size
+
+class FileSystem(object):
+    """Flat arrays storage for huge trees, entries are referenced by index and the root is 0."""
+
+    def __init__(self) -> None:
+        self.parents = array('q', [-1])
+        self.names = ['/']
+        self.own_sizes = array('q', [0])
+        self._sizes = None
+        self.file_directories = array('q')
+        self.file_names = []
+        self.file_sizes = array('q')
+        self._children = {}
+
+    @property
+    def root(self) -> CompactDirectory:
+        return CompactDirectory(self, 0)
+
+    @property
+    def sizes(self) -> array:
+        """Total sizes of the directories, aggregated once after the tree changed."""
+        if self._sizes is None:
+            sizes = array('q', self.own_sizes)
+            # children are always created after their parent, so a reverse scan adds them up bottom to top
+            for index in range(len(sizes) - 1, 0, -1):
+                sizes[self.parents[index]] += sizes[index]
+            self._sizes = sizes
+        return self._sizes
+
+class CompactDirectory(object):
+    __slots__ = ('_fs', 'index')
+
+    def __init__(self, fs: FileSystem, index: int) -> None:
+        self._fs = fs
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return self._fs.names[self.index]
+
+    @property
+    def parent(self) -> CompactDirectory:
+        parent = self._fs.parents[self.index]
+        return CompactDirectory(self._fs, parent) if parent != -1 else None
+
+    @property
+    def size(self) -> int:
+        return self._fs.sizes[self.index]
+
+    def cd(self, directory_name: str) -> CompactDirectory:
+        return CompactDirectory(self._fs, self._fs._children[(self.index, directory_name)])
+
+    def mkdir(self, directory_name: str) -> CompactDirectory:
+        fs = self._fs
+        key = (self.index, sys.intern(directory_name))
+        if key not in fs._children:
+            fs._children[key] = len(fs.parents)
+            fs.parents.append(self.index)
+            fs.names.append(key[1])
+            fs.own_sizes.append(0)
+            fs._sizes = None
+        return CompactDirectory(fs, fs._children[key])
+
+    def create_file(self, file_name: str, file_size: int) -> CompactDirectory:
+        fs = self._fs
+        fs.file_directories.append(self.index)
+        fs.file_names.append(sys.intern(file_name))
+        fs.file_sizes.append(file_size)
+        fs.own_sizes[self.index] += file_size
+        fs._sizes = None
+        return self
+
+    def find_directories(self, predicate: Callable[[CompactDirectory], bool]) -> Iterator[CompactDirectory]:
+        """Scans every directory created after this one, so even a small subtree costs O(directories) time and bytes."""
+        fs = self._fs
+        if self.index == 0:
+            for index in range(len(fs.parents)):
+                directory = CompactDirectory(fs, index)
+                if predicate(directory):
+                    yield directory
+            return
+        # parents are always created before their children, so one forward scan finds the whole subtree
+        in_subtree = bytearray(len(fs.parents))
+        in_subtree[self.index] = 1
+        for index in range(self.index, len(fs.parents)):
+            if index != self.index:
+                if not in_subtree[fs.parents[index]]:
+                    continue
+                in_subtree[index] = 1
+            directory = CompactDirectory(fs, index)
+            if predicate(directory):
+                yield directory
+
+class SizeIndex(object):
+    def __init__(self, root: Union[Directory, CompactDirectory]) -> None:
+        self._directories = sorted(root.find_directories(lambda d: True), key=lambda d: d.size)
+        self._sizes = [directory.size for directory in self._directories]
+        self._prefix_sums = list(accumulate(self._sizes, initial=0))
+
+    def sum_at_most(self, size: int) -> int:
+        return self._prefix_sums[bisect_right(self._sizes, size)]
+
+    def smallest_at_least(self, size: int) -> Union[Directory, CompactDirectory]:
+        i = bisect_left(self._sizes, size)
+        return self._directories[i] if i < len(self._directories) else None
+
+    def largest(self, n: int) -> List[Union[Directory, CompactDirectory]]:
+        return self._directories[max(len(self._directories) - n, 0):][::-1]
 
 class Parser(object):
-    __cd_regex = re.compile('^\$ cd (?P<directory>\w+)')
-    __file_regex = re.compile('^(?P<file_size>\d+) (?P<file_name>.+)')
+    __cd_regex = re.compile(r'^\$ cd (?P<directory>.+)')
+    __file_regex = re.compile(r'^(?P<file_size>\d+) (?P<file_name>.+)')
 
     def __init__(self, root: Directory) -> None:
         self._root = root
@@ -81,9 +203,59 @@ class Parser(object):
             self._current.create_file(file_match['file_name'], int(file_match['file_size']))
             return
 
+    def parse_buffer(self, buffer: bytes) -> None:
+        start = 0
+        length = len(buffer)
+        while start < length:
+            end = buffer.find(b'\n', start)
+            if end == -1:
+                end = length
+            line = buffer[start:end].rstrip(b'\r')
+            start = end + 1
 
-if __name__ == '__main__':
+            if not line:
+                continue
 
+            first = line[0]
+            # parse commands, `$ ls` needs no action
+            if first == ord('$'):
+                if line[2:4] == b'cd':
+                    directory = line[5:]
+                    if directory == b'/':
+                        self._current = self._root
+                    elif directory == b'..':
+                        self._current = self._current.parent
+                    else:
+                        self._current = self._current.cd(directory.decode())
+
+            # parse ls output
+            elif first == ord('d'):
+                self._current.mkdir(line[4:].decode())
+
+            elif ord('0') <= first <= ord('9'):
+                separator = line.index(b' ')
+                self._current.create_file(line[separator + 1:].decode(), int(line[:separator]))
+
+
+def _answer(root: Directory, index: SizeIndex, part: int) -> int:
+    if part == 1:
+        return index.sum_at_most(100000)
+    return index.smallest_at_least(UPDATE_SIZE - (TOTAL_DISK_SPACE - root.size)).size
+
+def _index(buffer: bytes) -> Tuple[Directory, SizeIndex]:
+    root = Directory('/')
+    Parser(root).parse_buffer(buffer)
+    return (root, SizeIndex(root))
+
+def solve(buffer: bytes, part: int) -> int:
+    (root, index) = _index(buffer)
+    return _answer(root, index, part)
+
+def solve_all(buffer: bytes) -> List[int]:
+    (root, index) = _index(buffer)
+    return [_answer(root, index, part) for part in (1, 2)]
+
+def verify() -> None:
     # part 1
     test_root = Directory('/')
     test_parser = Parser(test_root)
@@ -112,19 +284,48 @@ if __name__ == '__main__':
     test_parser.parse('7214296 k')
     assert sum(directory.size for directory in test_root.find_directories(lambda d: d.size <= 100000)) == 95437
 
-    root = Directory('/')
-    parser = Parser(root)
-    for line in fileinput.input():
-        parser.parse(line.strip())
-    sum_sizes = sum(directory.size for directory in root.find_directories(lambda d: d.size <= 100000))
-    print(f"Sum total sizes directories at most 100000: {sum_sizes}")
-    
+    test_fs = FileSystem()
+    test_fs_parser = Parser(test_fs.root)
+    for line in ['$ cd /', '$ ls', 'dir a', '14848514 b.txt', '8504156 c.dat', 'dir d', '$ cd a', '$ ls', 'dir e',
+                 '29116 f', '2557 g', '62596 h.lst', '$ cd e', '$ ls', '584 i', '$ cd ..', '$ cd ..', '$ cd d', '$ ls',
+                 '4060174 j', '8033020 d.log', '5626152 d.ext', '7214296 k']:
+        test_fs_parser.parse(line)
+    assert sum(directory.size for directory in test_fs.root.find_directories(lambda d: d.size <= 100000)) == 95437
+    assert [directory.name for directory in test_fs.root.cd('a').find_directories(lambda d: True)] == ['a', 'e']
+
+    test_buffer_root = Directory('/')
+    Parser(test_buffer_root).parse_buffer(b'$ cd /\n$ ls\ndir a.b\n10 c\n$ cd a.b\n$ ls\n20 d.txt\r\n$ cd ..\n')
+    assert test_buffer_root.size == 30
+    assert test_buffer_root.cd('a.b').size == 20
+
     # part 2
     test_minimum_size = UPDATE_SIZE - (TOTAL_DISK_SPACE - test_root.size)
     test_directory_to_delete = min(test_root.find_directories(lambda d: d.size >= test_minimum_size), key=lambda d: d.size)
     assert test_directory_to_delete.name == 'd'
     assert test_directory_to_delete.size == 24933642
 
+    test_index = SizeIndex(test_root)
+    assert test_index.sum_at_most(100000) == 95437
+    assert test_index.smallest_at_least(test_minimum_size).name == 'd'
+    assert [directory.name for directory in test_index.largest(2)] == ['/', 'd']
+    assert len(test_index.largest(10)) == 4
+
+if __name__ == '__main__':
+    # the puzzle examples are only checked on request
+    if '--verify' in sys.argv:
+        sys.argv.remove('--verify')
+        verify()
+
+    root = Directory('/')
+    parser = Parser(root)
+    parser.parse_buffer(b''.join(fileinput.input(mode='rb')))
+    index = SizeIndex(root)
+
+    # part 1
+    sum_sizes = index.sum_at_most(100000)
+    print(f"Sum total sizes directories at most 100000: {sum_sizes}")
+
+    # part 2
     minimum_size = UPDATE_SIZE - (TOTAL_DISK_SPACE - root.size)
-    directory_to_delete = min(root.find_directories(lambda d: d.size >= minimum_size), key=lambda d: d.size)
+    directory_to_delete = index.smallest_at_least(minimum_size)
     print(f"Directory to delete size: {directory_to_delete.size}")
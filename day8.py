@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
-import fileinput
-from typing import List
+from array import array
+import sys
+import tempfile
+from typing import List, Sequence, Tuple
+
+import numpy as np
 
 def visibility_mask(tree_line: List[int]) -> List[bool]:
     mask = []
@@ -46,6 +50,44 @@ def visible_trees(trees: List[List[int]]) -> List[List[bool]]:
     # final transpose
     return [list(tree_line) for tree_line in zip(*visible_trees)]
 
+def view_trees(buffer: bytes) -> np.ndarray:
+    """Zero copy grid of the ASCII digits, the line breaks are skipped using them as row stride."""
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    width = len(data)
+    line_break = 1
+    for start in range(0, len(data), 1 << 16):
+        line_breaks = np.flatnonzero(data[start:start + (1 << 16)] == ord('\n'))
+        if len(line_breaks):
+            width = start + int(line_breaks[0])
+            if width and data[width - 1] == ord('\r'):
+                width -= 1
+                line_break = 2
+            break
+    # every row is followed by its line break, the last one may not be
+    stride = width + line_break
+    rows = (len(data) + line_break) // stride
+    data = data[:rows * stride - line_break]
+    return np.lib.stride_tricks.as_strided(data, shape=(rows, width), strides=(stride, 1))
+
+def load_trees(buffer: bytes) -> np.ndarray:
+    return view_trees(buffer) - ord('0')
+
+def map_trees(path: str) -> np.ndarray:
+    return view_trees(np.memmap(path, dtype=np.uint8, mode='r'))
+
+def _visible_from_left(trees: np.ndarray) -> np.ndarray:
+    tallest_trees = np.maximum.accumulate(trees, axis=1)
+    visible = np.ones(trees.shape, dtype=bool)
+    visible[:, 1:] = trees[:, 1:] > tallest_trees[:, :-1]
+    return visible
+
+def visible_trees_array(trees: np.ndarray) -> np.ndarray:
+    visible = _visible_from_left(trees)
+    visible |= _visible_from_left(trees[:, ::-1])[:, ::-1]
+    visible |= _visible_from_left(trees.T).T
+    visible |= _visible_from_left(trees.T[:, ::-1])[:, ::-1].T
+    return visible
+
 def scenic_score(trees: List[List[int]]) -> List[List[int]]:
     def tree_score(trees: List[List[int]], x: int, y: int) -> int:
         tree_height = trees[y][x]
@@ -88,7 +130,166 @@ def scenic_score(trees: List[List[int]]) -> List[List[int]]:
             scores[y][x] = tree_score(trees, x, y)
     return scores
 
-if __name__ == '__main__':
+def viewing_distances(tree_line: Sequence[int]) -> List[int]:
+    # stack of the positions of trees not yet blocked by a taller or equal tree, from the left
+    distances = []
+    stack = []
+    for (i, tree) in enumerate(tree_line):
+        while stack and tree_line[stack[-1]] < tree:
+            stack.pop()
+        distances.append(i - stack[-1] if stack else i)
+        stack.append(i)
+    return distances
+
+def max_scenic_score(trees: Sequence[Sequence[int]]) -> Tuple[int, int, int]:
+    """Max scenic score and its (x, y) coordinates."""
+    height = len(trees)
+    width = len(trees[0]) if height else 0
+
+    # up and down viewing distances product, one monotonic stack per column
+    vertical_scores = array('q', [1]) * (height * width)
+    for (rows, distance) in ((range(height), lambda y, top: y - top),
+                             (range(height - 1, -1, -1), lambda y, top: top - y)):
+        stacks = [[] for _ in range(width)]
+        for y in rows:
+            tree_line = trees[y]
+            for x in range(width):
+                tree = tree_line[x]
+                stack = stacks[x]
+                while stack and trees[stack[-1]][x] < tree:
+                    stack.pop()
+                vertical_scores[y * width + x] *= distance(y, stack[-1]) if stack else distance(y, rows[0])
+                stack.append(y)
+
+    # left and right viewing distances, row by row
+    best = (0, 0, 0)
+    for y in range(height):
+        tree_line = trees[y]
+        left = viewing_distances(tree_line)
+        right = viewing_distances(tree_line[::-1])[::-1]
+        for x in range(width):
+            score = left[x] * right[x] * vertical_scores[y * width + x]
+            if score > best[0]:
+                best = (score, x, y)
+    return best
+
+BAND_HEIGHT = 256
+TILE_WIDTH = 4096
+
+def _tiles(trees: np.ndarray, band_height: int, tile_width: int) -> Tuple[range, range]:
+    (height, width) = trees.shape
+    return (range(0, height, band_height), range(0, width, tile_width))
+
+def _tile(trees: np.ndarray, y: int, x: int, band_height: int, tile_width: int) -> np.ndarray:
+    return trees[y:y + band_height, x:x + tile_width].astype(np.int8) - ord('0')
+
+def _spill(shape: Tuple[int, ...], dtype: type) -> np.ndarray:
+    """Array backed by a temporary file, so boundary state between tiles does not stay in memory."""
+    return np.memmap(tempfile.TemporaryFile(), dtype=dtype, mode='w+', shape=shape)
+
+def _visible_from_top(trees: np.ndarray, tallest: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Trees visible from the top given the tallest tree above every column, and the tallest trees including them."""
+    above = np.maximum.accumulate(np.vstack((tallest, trees)), axis=0)
+    return (trees > above[:-1], above[-1])
+
+def count_visible_trees_tiled(trees: np.ndarray, band_height: int = BAND_HEIGHT, tile_width: int = TILE_WIDTH) -> int:
+    """Visible trees of an ASCII digits grid, see map_trees, loading band_height x tile_width trees at a time."""
+    (height, width) = trees.shape
+    (ys, xs) = _tiles(trees, band_height, tile_width)
+
+    # tallest tree below every tile and right of every tile
+    tallest_below = _spill((len(ys), width), np.int8)
+    for x in xs:
+        tallest = np.full(min(tile_width, width - x), -1, dtype=np.int8)
+        for i in reversed(range(len(ys))):
+            tallest_below[i, x:x + tile_width] = tallest
+            tallest = np.maximum(tallest, _tile(trees, ys[i], x, band_height, tile_width).max(axis=0))
+    tallest_right = _spill((len(xs), height), np.int8)
+    for y in ys:
+        tallest = np.full(min(band_height, height - y), -1, dtype=np.int8)
+        for j in reversed(range(len(xs))):
+            tallest_right[j, y:y + band_height] = tallest
+            tallest = np.maximum(tallest, _tile(trees, y, xs[j], band_height, tile_width).max(axis=1))
+
+    visible_trees = 0
+    tallest_above = _spill((width,), np.int8)
+    tallest_above[:] = -1
+    for (i, y) in enumerate(ys):
+        tallest_left = np.full(min(band_height, height - y), -1, dtype=np.int8)
+        for (j, x) in enumerate(xs):
+            tile = _tile(trees, y, x, band_height, tile_width)
+            (visible, tallest_above[x:x + tile_width]) = _visible_from_top(tile, tallest_above[x:x + tile_width])
+            visible |= _visible_from_top(tile[::-1], tallest_below[i, x:x + tile_width])[0][::-1]
+            (visible_left, tallest_left) = _visible_from_top(tile.T, tallest_left)
+            visible |= visible_left.T
+            visible |= _visible_from_top(tile.T[::-1], tallest_right[j, y:y + band_height])[0][::-1].T
+            visible_trees += int(visible.sum())
+    return visible_trees
+
+_heights = np.arange(10, dtype=np.int8)[:, None]
+
+def _viewing_distances(trees: np.ndarray, blockers: np.ndarray, start: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Viewing distances looking up of trees whose rows are at positions start, start + 1..., and the updated blockers.
+
+    blockers[h][i] is the position of the closest tree of height h or more above column i,
+    a monotonic stack collapsed to the ten possible heights.
+    """
+    columns = np.arange(trees.shape[1])
+    distances = np.empty(trees.shape, dtype=np.int32)
+    for y in range(len(trees)):
+        distances[y] = (start + y) - blockers[trees[y], columns]
+        blockers = np.where(_heights <= trees[y], start + y, blockers)
+    return (distances, blockers)
+
+def max_scenic_score_tiled(trees: np.ndarray, band_height: int = BAND_HEIGHT, tile_width: int = TILE_WIDTH) -> Tuple[int, int, int]:
+    """Max scenic score and its (x, y) coordinates of an ASCII digits grid, loading band_height x tile_width trees at a time."""
+    (height, width) = trees.shape
+    (ys, xs) = _tiles(trees, band_height, tile_width)
+
+    # looking down or right, positions are counted from the bottom or right edge,
+    # blockers below every tile and right of every tile are computed first
+    blockers_below = _spill((len(ys), 10, width), np.int32)
+    for x in xs:
+        blockers = np.zeros((10, min(tile_width, width - x)), dtype=np.int32)
+        for i in reversed(range(len(ys))):
+            blockers_below[i, :, x:x + tile_width] = blockers
+            tile = _tile(trees, ys[i], x, band_height, tile_width)
+            (_, blockers) = _viewing_distances(tile[::-1], blockers, height - ys[i] - len(tile))
+    blockers_right = _spill((len(xs), 10, height), np.int32)
+    for y in ys:
+        blockers = np.zeros((10, min(band_height, height - y)), dtype=np.int32)
+        for j in reversed(range(len(xs))):
+            blockers_right[j, :, y:y + band_height] = blockers
+            tile = _tile(trees, y, xs[j], band_height, tile_width)
+            (_, blockers) = _viewing_distances(tile.T[::-1], blockers, width - xs[j] - tile.shape[1])
+
+    best = (0, 0, 0)
+    blockers_above = _spill((10, width), np.int32)
+    for (i, y) in enumerate(ys):
+        blockers_left = np.zeros((10, min(band_height, height - y)), dtype=np.int32)
+        for (j, x) in enumerate(xs):
+            tile = _tile(trees, y, x, band_height, tile_width)
+            (rows, columns) = tile.shape
+            (up, blockers_above[:, x:x + tile_width]) = _viewing_distances(tile, blockers_above[:, x:x + tile_width], y)
+            (down, _) = _viewing_distances(tile[::-1], blockers_below[i, :, x:x + tile_width], height - y - rows)
+            (left, blockers_left) = _viewing_distances(tile.T, blockers_left, x)
+            (right, _) = _viewing_distances(tile.T[::-1], blockers_right[j, :, y:y + band_height], width - x - columns)
+            scores = up.astype(np.int64) * down[::-1] * left.T * right[::-1].T
+
+            (tile_y, tile_x) = np.unravel_index(np.argmax(scores), scores.shape)
+            score = int(scores[tile_y, tile_x])
+            # ties go to the first tree in row order, as with a single band
+            if score > best[0] or (score == best[0] and (y + tile_y, x + tile_x) < (best[2], best[1])):
+                best = (score, x + int(tile_x), y + int(tile_y))
+    return best
+
+def solve(buffer: bytes, part: int) -> int:
+    if part == 1:
+        return count_visible_trees_tiled(view_trees(buffer))
+    (best_scenic_score, _, _) = max_scenic_score_tiled(view_trees(buffer))
+    return best_scenic_score
+
+def verify() -> None:
     test_trees = [
         [3, 0, 3, 7, 3],
         [2, 5, 5, 1, 2],
@@ -98,14 +299,33 @@ if __name__ == '__main__':
     ]
     assert sum(tree for tree_line in visible_trees(test_trees) for tree in tree_line) == 21
 
-    trees = []
-    for tree_line in fileinput.input():
-        trees.append([int(tree) for tree in tree_line.strip()])
+    assert visible_trees_array(load_trees(b'30373\n25512\n65332\n33549\n35390\n')).sum() == 21
+    assert visible_trees_array(load_trees(b'30373\n25512\n65332\n33549\n35390')).sum() == 21
 
-    outside_visible_trees = sum(tree for tree_line in visible_trees(trees) for tree in tree_line)
-    print(f"Visible trees from the outside: {outside_visible_trees}")
-    
     assert max(score for score_line in scenic_score(test_trees) for score in score_line) == 8
 
-    max_scenic_score = max(score for score_line in scenic_score(trees) for score in score_line)
-    print(f"Max scenic score: {max_scenic_score}")
+    assert max_scenic_score(test_trees) == (8, 2, 3)
+
+    test_buffer = b'30373\n25512\n65332\n33549\n35390\n'
+    assert count_visible_trees_tiled(view_trees(test_buffer), 2) == 21
+    assert count_visible_trees_tiled(view_trees(test_buffer), 2, 2) == 21
+    assert max_scenic_score_tiled(view_trees(test_buffer), 2) == (8, 2, 3)
+    assert max_scenic_score_tiled(view_trees(test_buffer), 2, 3) == (8, 2, 3)
+    assert solve(test_buffer, 1) == 21
+    assert solve(test_buffer, 2) == 8
+    assert solve(test_buffer.replace(b'\n', b'\r\n'), 1) == 21
+    assert solve(test_buffer.replace(b'\n', b'\r\n').rstrip(), 2) == 8
+
+if __name__ == '__main__':
+    # the puzzle examples are only checked on request
+    if '--verify' in sys.argv:
+        sys.argv.remove('--verify')
+        verify()
+
+    trees = map_trees(sys.argv[1]) if len(sys.argv) == 2 else view_trees(sys.stdin.buffer.read())
+
+    outside_visible_trees = count_visible_trees_tiled(trees)
+    print(f"Visible trees from the outside: {outside_visible_trees}")
+
+    (best_scenic_score, _, _) = max_scenic_score_tiled(trees)
+    print(f"Max scenic score: {best_scenic_score}")
@@ -4,7 +4,10 @@ from enum import Enum
 import fileinput
 import math
 import re
-from typing import Tuple
+import sys
+from typing import Iterable, Iterator, List, Tuple
+
+from aoc import read_lines
 
 DIRECTIONS = {
     'U': (0, 1), 
@@ -63,9 +66,134 @@ class Rope(object):
                 self.knots[i].follow(self.knots[i - 1])
             self.tail_positions.add(Point(self.knots[-1]))
 
-if __name__ == '__main__':
-    movements = [line.strip() for line in fileinput.input()]
+class SparseBitmap(object):
+    """Set of cells stored as bits of 64x64 cells chunks, allocated only where cells are added."""
+    __chunk_bits = 6
+    __chunk_mask = (1 << 6) - 1
+    __offset = 1 << 31
+
+    def __init__(self) -> None:
+        self._chunks = {}
+        self._count = 0
+
+    def _locate(self, x: int, y: int) -> Tuple[int, int]:
+        # chunk coordinates are packed in a single 64 bits key
+        key = ((x >> self.__chunk_bits) + self.__offset) << 32 | ((y >> self.__chunk_bits) + self.__offset)
+        bit = (y & self.__chunk_mask) << self.__chunk_bits | (x & self.__chunk_mask)
+        return (key, bit)
+
+    def add(self, x: int, y: int) -> None:
+        (key, bit) = self._locate(x, y)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._chunks[key] = bytearray(1 << (2 * self.__chunk_bits - 3))
+        if not chunk[bit >> 3] & (1 << (bit & 7)):
+            chunk[bit >> 3] |= 1 << (bit & 7)
+            self._count += 1
+
+    def add_line(self, x: int, y: int, dx: int, dy: int, length: int) -> None:
+        """Add the cells (x + i * dx, y + i * dy) for i in range(length)."""
+        if dy != 0 or dx == 0:
+            for i in range(length):
+                self.add(x + i * dx, y + i * dy)
+            return
+
+        # horizontal lines set a run of bits of a chunk row at once
+        start = x if dx > 0 else x - (length - 1)
+        end = start + length - 1
+        while start <= end:
+            run_end = min(end, start | self.__chunk_mask)
+            (key, bit) = self._locate(start, y)
+            chunk = self._chunks.get(key)
+            if chunk is None:
+                chunk = self._chunks[key] = bytearray(1 << (2 * self.__chunk_bits - 3))
+            row = (bit >> 3) & ~7
+            mask = ((1 << (run_end - start + 1)) - 1) << (start & self.__chunk_mask)
+            cells = int.from_bytes(chunk[row:row + 8], 'little')
+            self._count += (mask & ~cells).bit_count()
+            chunk[row:row + 8] = (cells | mask).to_bytes(8, 'little')
+            start = run_end + 1
 
+    def __contains__(self, cell: Tuple[int, int]) -> bool:
+        (key, bit) = self._locate(*cell)
+        chunk = self._chunks.get(key)
+        return chunk is not None and bool(chunk[bit >> 3] & (1 << (bit & 7)))
+
+    def __len__(self) -> int:
+        return self._count
+
+class FastRope(object):
+    def __init__(self, knots: int, tracked: Iterable[int] = None) -> None:
+        self._xs = [0] * knots
+        self._ys = [0] * knots
+        # knot k follows the same path as the tail of a rope with k + 1 knots,
+        # only the positions of the tracked knots, by default the tail, are recorded
+        tracked = {knots - 1} if tracked is None else set(tracked)
+        self.knot_positions = [SparseBitmap() if i in tracked else None for i in range(knots)]
+        self.tail_positions = self.knot_positions[-1]
+        # the tail of a rope with more than one knot is still at the start after the first step
+        for positions in self.knot_positions[1:]:
+            if positions is not None:
+                positions.add(0, 0)
+
+    def move(self, move: str) -> None:
+        (dx, dy) = DIRECTIONS[move[0]]
+        xs = self._xs
+        ys = self._ys
+        tail = len(xs) - 1
+        knot_positions = self.knot_positions
+        steps = int(move[2:])
+        while steps:
+            steps -= 1
+            xs[0] += dx
+            ys[0] += dy
+            if knot_positions[0] is not None:
+                knot_positions[0].add(xs[0], ys[0])
+            taut = True
+            for i in range(1, tail + 1):
+                vx = xs[i - 1] - xs[i]
+                vy = ys[i - 1] - ys[i]
+                if -1 <= vx <= 1 and -1 <= vy <= 1:
+                    # the rest of the knots do not move either
+                    taut = False
+                    break
+                mx = (vx > 0) - (vx < 0)
+                my = (vy > 0) - (vy < 0)
+                taut = taut and mx == dx and my == dy
+                xs[i] += mx
+                ys[i] += my
+                if knot_positions[i] is not None:
+                    knot_positions[i].add(xs[i], ys[i])
+
+            # when every knot moved like the head the rope keeps its shape,
+            # so the remaining steps shift the whole rope in a straight line
+            if taut and steps:
+                for i in range(tail + 1):
+                    if knot_positions[i] is not None:
+                        knot_positions[i].add_line(xs[i] + dx, ys[i] + dy, dx, dy, steps)
+                    xs[i] += steps * dx
+                    ys[i] += steps * dy
+                steps = 0
+
+def read_movements(buffer: bytes) -> Iterator[str]:
+    for line in read_lines(buffer):
+        if line.strip():
+            yield line.decode()
+
+def solve(buffer: bytes, part: int) -> int:
+    rope = FastRope(2 if part == 1 else 10)
+    for movement in read_movements(buffer):
+        rope.move(movement)
+    return len(rope.tail_positions)
+
+def solve_all(buffer: bytes) -> List[int]:
+    # the tail of the two knots rope follows the second knot of the ten knots one
+    rope = FastRope(10, tracked=(1, 9))
+    for movement in read_movements(buffer):
+        rope.move(movement)
+    return [len(rope.knot_positions[1]), len(rope.tail_positions)]
+
+def verify() -> None:
     # part 1
     test_rope = Rope(2)
     test_rope.move('R 4')
@@ -78,10 +206,10 @@ if __name__ == '__main__':
     test_rope.move('R 2')
     assert len(test_rope.tail_positions) == 13
 
-    rope = Rope(2)
-    for movement in movements:
-        rope.move(movement)
-    print(f'Tail of rope with 2 knots has been in {len(rope.tail_positions)}')
+    test_rope = FastRope(2)
+    for movement in ['R 4', 'U 4', 'L 3', 'D 1', 'R 4', 'D 1', 'L 5', 'R 2']:
+        test_rope.move(movement)
+    assert len(test_rope.tail_positions) == 13
 
     # part 2
     test_rope = Rope(10)
@@ -95,7 +223,38 @@ if __name__ == '__main__':
     test_rope.move('U 20')
     assert len(test_rope.tail_positions) == 36
 
-    rope = Rope(10)
+    test_rope = FastRope(10)
+    for movement in ['R 5', 'U 8', 'L 8', 'D 3', 'R 17', 'D 10', 'L 25', 'U 20']:
+        test_rope.move(movement)
+    assert len(test_rope.tail_positions) == 36
+
+    test_rope = FastRope(10)
+    test_rope.move('R 100000')
+    test_rope.move('U 100000')
+    assert len(test_rope.tail_positions) == 199983
+
+    test_rope = FastRope(10, tracked=(1, 9))
+    for movement in ['R 4', 'U 4', 'L 3', 'D 1', 'R 4', 'D 1', 'L 5', 'R 2']:
+        test_rope.move(movement)
+    assert len(test_rope.knot_positions[1]) == 13
+    assert len(test_rope.knot_positions[9]) == 1
+    assert test_rope.knot_positions[5] is None
+
+    assert solve(b'R 4\nU 4\nL 3\nD 1\nR 4\nD 1\nL 5\nR 2\n', 1) == 13
+    assert solve(b'R 5\nU 8\nL 8\nD 3\nR 17\nD 10\nL 25\nU 20\n', 2) == 36
+    assert solve_all(b'R 4\nU 4\nL 3\nD 1\nR 4\nD 1\nL 5\nR 2\n') == [13, 1]
+
+if __name__ == '__main__':
+    # the puzzle examples are only checked on request
+    if '--verify' in sys.argv:
+        sys.argv.remove('--verify')
+        verify()
+
+    movements = [line.strip() for line in fileinput.input()]
+
+    # a single rope with 10 knots gives the tail positions of every shorter rope
+    rope = FastRope(10, tracked=(1, 9))
     for movement in movements:
         rope.move(movement)
+    print(f'Tail of rope with 2 knots has been in {len(rope.knot_positions[1])}')
     print(f'Tails of rope with 10 knots has been in {len(rope.tail_positions)}')